@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import os.path
 import argparse
+from functools import lru_cache
 from subprocess import check_call
 
 # TODO: -S argument for shifted ROMs
@@ -112,6 +113,15 @@ if mybin == basebin:
     exit(0)
 
 
+@lru_cache(maxsize=None)
+def read_map(fname):
+    # search_map is called for many addresses per run, so only read each
+    # map file from disk once
+    with open(fname) as f:
+        return f.readlines()
+
+
+@lru_cache(maxsize=None)
 def search_map(rom_addr):
     ram_offset = None
     last_ram = 0
@@ -119,39 +129,38 @@ def search_map(rom_addr):
     last_fn = "<start of rom>"
     last_file = "<no file>"
     prev_line = ""
-    with open(mymap) as f:
-        for line in f:
-            if "load address" in line:
-                # Example: ".boot           0x0000000004000000     0x1000 load address 0x0000000000000000"
-                if "noload" in line or "noload" in prev_line:
-                    ram_offset = None
-                    continue
-                ram = int(line[16 : 16 + 18], 0)
-                rom = int(line[59 : 59 + 18], 0)
-                ram_offset = ram - rom
-                continue
-            prev_line = line
-
-            if (
-                ram_offset is None
-                or "=" in line
-                or "*fill*" in line
-                or " 0x" not in line
-            ):
-                continue
-            ram = int(line[16 : 16 + 18], 0)
-            rom = ram - ram_offset
-            fn = line.split()[-1]
-            if "0x" in fn:
+    for line in read_map(mymap):
+        if "load address" in line:
+            # Example: ".boot           0x0000000004000000     0x1000 load address 0x0000000000000000"
+            if "noload" in line or "noload" in prev_line:
                 ram_offset = None
                 continue
-            if rom > rom_addr or (rom_addr & 0x80000000 and ram > rom_addr):
-                return f"in {last_fn} (ram 0x{last_ram:08x}, rom 0x{last_rom:06x}, {last_file})"
-            last_ram = ram
-            last_rom = rom
-            last_fn = fn
-            if "/" in fn:
-                last_file = fn
+            ram = int(line[16 : 16 + 18], 0)
+            rom = int(line[59 : 59 + 18], 0)
+            ram_offset = ram - rom
+            continue
+        prev_line = line
+
+        if (
+            ram_offset is None
+            or "=" in line
+            or "*fill*" in line
+            or " 0x" not in line
+        ):
+            continue
+        ram = int(line[16 : 16 + 18], 0)
+        rom = ram - ram_offset
+        fn = line.split()[-1]
+        if "0x" in fn:
+            ram_offset = None
+            continue
+        if rom > rom_addr or (rom_addr & 0x80000000 and ram > rom_addr):
+            return f"in {last_fn} (ram 0x{last_ram:08x}, rom 0x{last_rom:06x}, {last_file})"
+        last_ram = ram
+        last_rom = rom
+        last_fn = fn
+        if "/" in fn:
+            last_file = fn
     return "at end of rom?"
 
 
@@ -161,35 +170,34 @@ def parse_map(fname):
     syms = {}
     prev_sym = None
     prev_line = ""
-    with open(fname) as f:
-        for line in f:
-            if "load address" in line:
-                if "noload" in line or "noload" in prev_line:
-                    ram_offset = None
-                    continue
-                ram = int(line[16 : 16 + 18], 0)
-                rom = int(line[59 : 59 + 18], 0)
-                ram_offset = ram - rom
-                continue
-            prev_line = line
-
-            if (
-                ram_offset is None
-                or "=" in line
-                or "*fill*" in line
-                or " 0x" not in line
-            ):
+    for line in read_map(fname):
+        if "load address" in line:
+            if "noload" in line or "noload" in prev_line:
+                ram_offset = None
                 continue
             ram = int(line[16 : 16 + 18], 0)
-            rom = ram - ram_offset
-            fn = line.split()[-1]
-            if "0x" in fn:
-                ram_offset = None
-            elif "/" in fn:
-                cur_file = fn
-            else:
-                syms[fn] = (rom, cur_file, prev_sym, ram)
-                prev_sym = fn
+            rom = int(line[59 : 59 + 18], 0)
+            ram_offset = ram - rom
+            continue
+        prev_line = line
+
+        if (
+            ram_offset is None
+            or "=" in line
+            or "*fill*" in line
+            or " 0x" not in line
+        ):
+            continue
+        ram = int(line[16 : 16 + 18], 0)
+        rom = ram - ram_offset
+        fn = line.split()[-1]
+        if "0x" in fn:
+            ram_offset = None
+        elif "/" in fn:
+            cur_file = fn
+        else:
+            syms[fn] = (rom, cur_file, prev_sym, ram)
+            prev_sym = fn
     return syms
 
 
@@ -250,27 +258,36 @@ found_instr_diff = []
 map_search_diff = []
 diffs = 0
 shift_cap = 1000
-for i in range(24, len(mybin), 4):
-    # (mybin[i:i+4] != basebin[i:i+4], but that's slightly slower in CPython...)
-    if diffs <= shift_cap and (
-        mybin[i] != basebin[i]
-        or mybin[i + 1] != basebin[i + 1]
-        or mybin[i + 2] != basebin[i + 2]
-        or mybin[i + 3] != basebin[i + 3]
-    ):
-        if diffs == 0:
-            print(f"First difference at ROM addr {hex(i)}, {search_map(i)}")
-            print(
-                f"Bytes: {hexbytes(mybin[i : i + 4])} vs {hexbytes(basebin[i : i + 4])}"
-            )
-        diffs += 1
-    if (
-        len(found_instr_diff) < diff_count
-        and mybin[i] >> 2 != basebin[i] >> 2
-        and not search_map(i) in map_search_diff
-    ):
-        found_instr_diff.append(i)
-        map_search_diff.append(search_map(i))
+chunk_size = 0x1000
+mybin_view = memoryview(mybin)
+basebin_view = memoryview(basebin)
+for chunk_start in range(24, len(mybin), chunk_size):
+    chunk_end = min(chunk_start + chunk_size, len(mybin))
+    # Matching chunks can't contain a difference, so skip them with one
+    # buffer compare instead of walking every word in Python
+    if mybin_view[chunk_start:chunk_end] == basebin_view[chunk_start:chunk_end]:
+        continue
+    for i in range(chunk_start, chunk_end, 4):
+        # (mybin[i:i+4] != basebin[i:i+4], but that's slightly slower in CPython...)
+        if diffs <= shift_cap and (
+            mybin[i] != basebin[i]
+            or mybin[i + 1] != basebin[i + 1]
+            or mybin[i + 2] != basebin[i + 2]
+            or mybin[i + 3] != basebin[i + 3]
+        ):
+            if diffs == 0:
+                print(f"First difference at ROM addr {hex(i)}, {search_map(i)}")
+                print(
+                    f"Bytes: {hexbytes(mybin[i : i + 4])} vs {hexbytes(basebin[i : i + 4])}"
+                )
+            diffs += 1
+        if (
+            len(found_instr_diff) < diff_count
+            and mybin[i] >> 2 != basebin[i] >> 2
+            and not search_map(i) in map_search_diff
+        ):
+            found_instr_diff.append(i)
+            map_search_diff.append(search_map(i))
 if diffs == 0:
     print("No differences!")
     exit()
@@ -2,11 +2,9 @@
 #!/usr/bin/env python3
 
 import argparse
-import git
 import os
 import subprocess
 import sys
-from colour import Color
 
 def set_version(version):
     global script_dir, root_dir, asm_dir, build_dir, elf_path
@@ -85,6 +83,8 @@ def main(args):
         matching_ratio = (matching_size / total_size) * 100
 
     if args.csv:
+        import git
+
         version = 1
         git_object = git.Repo().head.object
         timestamp = str(git_object.committed_date)
@@ -94,6 +94,7 @@ def main(args):
         print(",".join(csv_list))
     elif args.shield_json:
         import json
+        from colour import Color
 
         # https://shields.io/endpoint
         color = Color("#50ca22", hue=lerp(0, 105/255, matching_ratio / 100))